@@ -6,227 +6,458 @@ Batch RSS generator + OPML per Feeder.
 - Per ogni riga genera un RSS .xml in output_feeds/
 - Alla fine crea feeds.opml che punta ai .xml via GitHub RAW (o file:// se BASE_URL è vuoto)
 
-Dipendenze: requests, beautifulsoup4, rfeed, openpyxl
+Dipendenze: aiohttp, selectolax (o beautifulsoup4), lxml (opzionale), python-calamine (o openpyxl)
 Uso:
   python3 batch_make_feeds.py --excel feeds.xlsx --out ./output_feeds
 """
 
-import argparse, os, re, html
+import argparse, asyncio, codecs, json, os, re, html, zipfile
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timezone
+from email.utils import format_datetime
 from urllib.parse import urljoin
 
-import requests
-from bs4 import BeautifulSoup
-import rfeed
-from openpyxl import load_workbook
+import aiohttp
 import time
 
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:  # selectolax non installato: si ripiega su bs4
+    LexborHTMLParser = None
+    from bs4 import BeautifulSoup
+    import soupsieve
+
+try:
+    from python_calamine import CalamineWorkbook
+except ImportError:  # calamine non installato: si ripiega su openpyxl
+    CalamineWorkbook = None
+    from openpyxl import load_workbook
+
+try:
+    import lxml.html
+    from lxml import etree
+except ImportError:  # lxml non installato: Doppiozero passa dal parser generico
+    lxml = None
+
 # ========= CONFIG =========
 # Base URL RAW del repo: trank1955/my-feeds
 BASE_URL = "https://raw.githubusercontent.com/trank1955/my-feeds/refs/heads/main/output_feeds"
 UA = ("Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 "
       "(KHTML, like Gecko) Chrome/124.0 Safari/537.36")
+# ETag/Last-Modified per file .xml generato, salvati nella cartella di output
+HTTP_CACHE = ".http_cache.json"
 # ==========================
 
+_SLUG_RE1 = re.compile(r"[^a-z0-9]+")
+_SLUG_RE2 = re.compile(r"-{2,}")
+
 def slugify(text: str) -> str:
     text = text.strip().lower()
-    text = re.sub(r"[^a-z0-9]+", "-", text)
-    text = re.sub(r"-{2,}", "-", text).strip("-")
+    text = _SLUG_RE1.sub("-", text)
+    text = _SLUG_RE2.sub("-", text).strip("-")
     return text or "feed"
 
-def fetch_html(url: str, timeout: int = 25) -> BeautifulSoup:
-    r = requests.get(url, headers={"User-Agent": UA}, timeout=timeout)
-    r.raise_for_status()
-    return BeautifulSoup(r.text, "html.parser")  # niente lxml
+# ---- Parser HTML ----
+# selectolax (Lexbor, in C) è molto più veloce di bs4+html.parser; se non è
+# installato si usa bs4. Gli estrattori passano solo da questi helper;
+# i selettori CSS sono compilati una volta (_sel) a livello di modulo.
+_ITEM_BOUNDARY = ("h1", "h2", "h3", "article")  # limite per _following_p
 
-def _dz_fetch(url: str) -> BeautifulSoup:
-    r = requests.get(url, headers={"User-Agent": UA}, timeout=20)
-    r.raise_for_status()
-    return BeautifulSoup(r.text, "html.parser")
+# <meta charset=...> o <meta http-equiv=... content="...; charset=...">
+_META_CHARSET_RE = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?\s*([\w.:-]+)""", re.I)
 
-def _dz_article_categories(article_url: str) -> list[str]:
-    """Categorie/tassonomie dall'articolo Doppiozero.
-    1) JSON-LD (articleSection/keywords)
-    2) breadcrumb/tag fallback
-    """
-    try:
-        soup = _dz_fetch(article_url)
-    except Exception:
-        return []
+def _page_encoding(markup: bytes, encoding: str | None = None) -> str:
+    """Charset con cui leggere la pagina, uguale per tutti i parser:
+    header, altrimenti <meta> nei primi KB, altrimenti UTF-8."""
+    if not encoding:
+        m = _META_CHARSET_RE.search(markup, 0, 4096)
+        encoding = m.group(1).decode("ascii") if m else None
+    if encoding:
+        try:
+            codecs.lookup(encoding)
+            return encoding
+        except LookupError:  # charset sconosciuto: si resta su UTF-8
+            pass
+    return "utf-8"
+
+def _utf8_or_text(markup: bytes, encoding: str | None = None):
+    """I bytes stessi se la pagina è UTF-8, altrimenti il testo già decodificato
+    (Lexbor e libxml2 non conoscono tutti i nomi di charset di Python)."""
+    enc = _page_encoding(markup, encoding)
+    return markup if codecs.lookup(enc).name == "utf-8" else markup.decode(enc, "replace")
+
+if LexborHTMLParser is not None:
+    def parse_html(markup, encoding: str | None = None):
+        # Lexbor legge i bytes come UTF-8 e ignora il <meta charset>
+        if isinstance(markup, bytes):
+            markup = _utf8_or_text(markup, encoding)
+        return LexborHTMLParser(markup)
+
+    def _sel(css: str):
+        return css  # Lexbor non espone selettori precompilati
+
+    def _select(node, sel):
+        return node.css(sel)
+
+    def _select_one(node, sel):
+        return node.css_first(sel)
+
+    def _attr(node, name: str):
+        return node.attributes.get(name)
+
+    def _text(node) -> str:
+        # i nodi di solo whitespace lascerebbero spazi doppi/finali
+        return " ".join(node.text(separator=" ").split())
+
+    def _tag(node) -> str:
+        return node.tag
+
+    def _next_p(node):
+        """Primo <p> tra i fratelli successivi di node."""
+        n = node.next
+        while n is not None and n.tag != "p":
+            n = n.next
+        return n
+
+    def _following_p(node):
+        """Primo <p> dopo node in ordine di documento, fermandosi al
+        prossimo titolo/<article> (la descrizione è di un altro item)."""
+        while node is not None:
+            sib = node.next
+            while sib is not None:
+                for el in sib.traverse():
+                    if el.tag == "p":
+                        return el
+                    if el.tag in _ITEM_BOUNDARY:
+                        return None
+                sib = sib.next
+            node = node.parent
+        return None
+else:
+    def parse_html(markup, encoding: str | None = None):
+        if isinstance(markup, bytes):
+            encoding = _page_encoding(markup, encoding)
+        return BeautifulSoup(markup, "html.parser", from_encoding=encoding)
+
+    def _sel(css: str):
+        return soupsieve.compile(css)
+
+    def _select(node, sel):
+        return sel.select(node)
+
+    def _select_one(node, sel):
+        return sel.select_one(node)
+
+    def _attr(node, name: str):
+        return node.get(name)
+
+    def _text(node) -> str:
+        return " ".join(node.get_text(" ").split())
+
+    def _tag(node) -> str:
+        return node.name
+
+    def _next_p(node):
+        """Primo <p> tra i fratelli successivi di node."""
+        return node.find_next_sibling("p")
+
+    def _following_p(node):
+        """Primo <p> dopo node in ordine di documento, fermandosi al
+        prossimo titolo/<article> (la descrizione è di un altro item)."""
+        el = node.find_next(["p", *_ITEM_BOUNDARY])
+        return el if el is not None and el.name == "p" else None
+
+_SEL_DZ_TEASER  = _sel(".view-content h2")
+_SEL_LIST_BLOCKS = _sel("article, h1, h2, h3")
+_SEL_A          = _sel("a")
+_SEL_A_HREF     = _sel("a[href]")
+_SEL_P          = _sel("p")
+
+# RSS 2.0 composto direttamente da stringhe (niente grafo di oggetti rfeed)
+FEED_TMPL = ('<?xml version="1.0" encoding="UTF-8"?>\n'
+             '<rss version="2.0"><channel>'
+             '<title>{title}</title><link>{link}</link><description>{desc}</description>'
+             '<language>it</language><lastBuildDate>{date}</lastBuildDate>'
+             '{items}</channel></rss>')
+ITEM_TMPL = ('<item><title>{t}</title><link>{l}</link><description>{d}</description>'
+             '<pubDate>{p}</pubDate><guid isPermaLink="true">{l}</guid></item>')
+
+# Teaser Doppiozero: XPath compilati una volta, valutati da libxml2
+if lxml is not None:
+    DZ_XPATH = etree.XPath(".//div[contains(@class,'view-content')]//h2//a")
+    DESC_XPATH = etree.XPath("normalize-space(./ancestor::h2[1]/following-sibling::p[1])")
 
-    cats: list[str] = []
+NOT_MODIFIED = object()  # risposta 304: il .xml già scritto è ancora buono
 
-    # --- (1) JSON-LD ---
-    import json
-    for s in soup.find_all("script", attrs={"type": "application/ld+json"}):
+async def fetch_bytes(session: aiohttp.ClientSession, url: str, cached: dict | None = None,
+                      timeout: int = 25, retries: int = 2):
+    """Ritorna (bytes, charset dell'header o None, validatori): la decodifica
+    la fa il parser. Con `cached` la GET è condizionale e su 304 ritorna
+    NOT_MODIFIED."""
+    headers = {}
+    if cached:
+        if cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached.get("lastmod"):
+            headers["If-Modified-Since"] = cached["lastmod"]
+    for attempt in range(retries + 1):
         try:
-            data = json.loads(s.string or "")
-        except Exception:
-            continue
-        # il JSON-LD può essere dict o list di dict
-        blocks = data if isinstance(data, list) else [data]
-        for b in blocks:
-            if not isinstance(b, dict):
-                continue
-            # articleSection può essere str o list
-            sec = b.get("articleSection")
-            if isinstance(sec, str):
-                cats.append(sec)
-            elif isinstance(sec, list):
-                cats.extend([str(x) for x in sec if x])
-            # keywords a volte contiene categorie/temi
-            kw = b.get("keywords")
-            if isinstance(kw, str):
-                # separa per virgola
-                cats.extend([x.strip() for x in kw.split(",") if x.strip()])
-            elif isinstance(kw, list):
-                cats.extend([str(x) for x in kw if x])
-
-    # --- (2) breadcrumb/tag fallback ---
-    for a in soup.select(".breadcrumb a, nav.breadcrumb a"):
-        t = a.get_text(" ", strip=True)
-        if t:
-            cats.append(t)
-
-    for sel in [
-        ".field--name-field-tags a",
-        ".field--name-taxonomy-forums a",
-        ".taxonomy-term a",
-        ".meta a",
-        ".node__meta a",
-    ]:
-        for a in soup.select(sel):
-            t = a.get_text(" ", strip=True)
-            if t:
-                cats.append(t)
-
-    # normalizza
-    return [c.strip().lower() for c in cats if isinstance(c, str)]
-
-def extract_items_generic(soup: BeautifulSoup, base_url: str):
+            async with session.get(url, headers=headers,
+                                   timeout=aiohttp.ClientTimeout(total=timeout)) as r:
+                if r.status == 304:
+                    return NOT_MODIFIED
+                r.raise_for_status()
+                validators = {"etag": r.headers.get("ETag"),
+                              "lastmod": r.headers.get("Last-Modified")}
+                return await r.read(), r.charset, validators
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+            if attempt == retries:
+                raise
+            await asyncio.sleep(0.3 * 2 ** attempt)
+
+def extract_items_generic(markup: bytes, base_url: str, encoding: str | None = None):
     """
     Estrattore per pagine lista.
-    - Preferenza Doppiozero: .view-content h2 a
+    - Preferenza Doppiozero: .view-content h2 a (XPath su lxml se c'è)
     - Generico: <article> + fallback su h1/h2/h3 a
     """
     items = []
+    dz = "doppiozero.com" in base_url
+    # alias locali: nei loop sugli anchor evitano i lookup globali/attributo
+    join, append = urljoin, items.append
+    select, select_one, attr, text, tag = _select, _select_one, _attr, _text, _tag
+    next_p, following_p = _next_p, _following_p
 
-    # Doppiozero: teaser liste
-    if "doppiozero.com" in base_url:
-        for a in soup.select(".view-content h2 a"):
+    # Doppiozero con lxml: un solo passaggio XPath per tutti i teaser
+    if dz and lxml is not None:
+        # senza charset libxml2 leggerebbe Latin-1: stessa regola degli altri parser
+        doc = _utf8_or_text(markup, encoding)
+        parser = lxml.html.HTMLParser(encoding="utf-8") if isinstance(doc, bytes) else None
+        desc_of = DESC_XPATH
+        try:
+            anchors = DZ_XPATH(lxml.html.fromstring(doc, parser=parser))
+        except etree.ParserError:  # corpo vuoto: si prosegue col parser generico
+            anchors = []
+        for a in anchors:
             href = a.get("href")
-            title = a.get_text(" ", strip=True)
+            title = " ".join(a.text_content().split())
             if not href or not title:
                 continue
-            link = urljoin(base_url, href)
-            p = a.find_parent("h2")
-            desc_tag = p.find_next("p") if p else None
-            desc = desc_tag.get_text(" ", strip=True) if desc_tag else None
-            items.append({"title": title, "link": link, "desc": desc})
+            link = join(base_url, href)
+            desc = desc_of(a) or None
+            append({"title": title, "link": link, "desc": desc})
 
-    # Generico: <article>
-    if not items:
-        for art in soup.select("article"):
-            a = art.find("a", href=True)
-            if not a:
+    tree = parse_html(markup, encoding) if not items else None
+
+    # Doppiozero senza lxml: teaser liste (descrizione = <p> fratello dell'h2)
+    if dz and lxml is None:
+        for h in select(tree, _SEL_DZ_TEASER):
+            a = select_one(h, _SEL_A)
+            if a is None:
                 continue
-            title = a.get_text(" ", strip=True) or a.get("title")
-            link  = urljoin(base_url, a["href"])
-            if not title or not link:
+            href = attr(a, "href")
+            title = text(a)
+            if not href or not title:
                 continue
-            p = art.find("p")
-            desc = p.get_text(" ", strip=True) if p else None
-            items.append({"title": title, "link": link, "desc": desc})
+            link = join(base_url, href)
+            desc_tag = next_p(h)
+            desc = text(desc_tag) if desc_tag is not None else None
+            append({"title": title, "link": link, "desc": desc})
 
-    # Fallback: titoli h1/h2/h3
+    # Generico: <article>, con fallback sui titoli h1/h2/h3. Un solo
+    # passaggio sul DOM; i titoli contano solo se non c'è nessun <article>.
     if not items:
-        for h in soup.select("h1 a, h2 a, h3 a, h2, h3"):
-            a = h if h.name == "a" else h.find("a", href=True)
-            if not a or not a.get("href"):
+        from_headings = []
+        for el in select(tree, _SEL_LIST_BLOCKS):
+            is_article = tag(el) == "article"
+            if not is_article and items:
+                continue
+            a = select_one(el, _SEL_A_HREF)
+            if a is None:
                 continue
-            title = a.get_text(" ", strip=True) or a.get("title")
-            link  = urljoin(base_url, a["href"])
+            title = text(a) or attr(a, "title")
+            link  = join(base_url, attr(a, "href"))
             if not title or not link:
                 continue
-            desc_tag = (h if h.name != "a" else h.parent).find_next("p")
-            desc = desc_tag.get_text(" ", strip=True) if desc_tag else None
-            items.append({"title": title, "link": link, "desc": desc})
+            if is_article:
+                p = select_one(el, _SEL_P)
+                desc = text(p) if p is not None else None
+                append({"title": title, "link": link, "desc": desc})
+            else:
+                desc_tag = following_p(el)
+                desc = text(desc_tag) if desc_tag is not None else None
+                from_headings.append({"title": title, "link": link, "desc": desc})
+        if not items:
+            items.extend(from_headings)
 
-    # Dedup
-    seen, out = set(), []
+    # Dedup per link (vince la prima occorrenza, ordine preservato)
+    out = {}
     for it in items:
-        if it["link"] in seen:
-            continue
-        seen.add(it["link"])
-        out.append(it)
-    return out
+        out.setdefault(it["link"], it)
+    return list(out.values())
+
 
+def _xml(text: str) -> str:
+    return html.escape(text, quote=False)
 
 def build_rss(name: str, base_url: str, items: list) -> str:
-    now = datetime.now(timezone.utc)
-    rss_items = []
-    for it in items:
-        rss_items.append(
-            rfeed.Item(
-                title=it["title"],
-                link=it["link"],
-                description=it.get("desc") or "",
-                guid=rfeed.Guid(it["link"]),
-                pubDate=now  # spesso la lista non espone date affidabili
-            )
-        )
-    feed = rfeed.Feed(
-        title=f"{name} (custom)",
-        link=base_url,
-        description=f"Feed generato automaticamente per {name}",
-        language="it",
-        lastBuildDate=now,
-        items=rss_items
+    # RFC 822; pubDate = ora, spesso la lista non espone date affidabili
+    now = format_datetime(datetime.now(timezone.utc), usegmt=True)
+    body = "".join(
+        ITEM_TMPL.format(t=_xml(it["title"]), l=_xml(it["link"]),
+                         d=_xml(it.get("desc") or ""), p=now)
+        for it in items
+    )
+    return FEED_TMPL.format(
+        title=_xml(f"{name} (custom)"),
+        link=_xml(base_url),
+        desc=_xml(f"Feed generato automaticamente per {name}"),
+        date=now,
+        items=body,
     )
-    return feed.rss()
+
+def write_atomic(path: str, data: bytes) -> None:
+    """Scrive su un .tmp e poi rinomina: un crash non lascia file troncati."""
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
 
 def write_opml_from_dir(dir_path: str, out_path: str, base_url: str | None) -> bool:
-    files = [f for f in sorted(os.listdir(dir_path)) if f.lower().endswith(".xml")]
-    if not files:
+    # scandir: nome e tipo arrivano già con la voce, niente stat() extra
+    with os.scandir(dir_path) as it:
+        entries = sorted((e for e in it if e.is_file() and e.name.lower().endswith(".xml")),
+                         key=lambda e: e.name)
+    if not entries:
         return False
     lines = []
-    for f in files:
-        name = os.path.splitext(f)[0]
+    for e in entries:
+        name = os.path.splitext(e.name)[0]
         text = html.escape(name)
         if base_url:
-            xml_url = base_url.rstrip("/") + "/" + f
+            xml_url = base_url.rstrip("/") + "/" + e.name
         else:
-            full = os.path.abspath(os.path.join(dir_path, f))
-            xml_url = "file://" + full
-        lines.append(f'    <outline text="{text}" type="rss" xmlUrl="{html.escape(xml_url)}"/>')
-    opml = """<?xml version="1.0" encoding="UTF-8"?>
+            xml_url = "file://" + os.path.abspath(e.path)
+        line = f'    <outline text="{text}" type="rss" xmlUrl="{html.escape(xml_url)}"/>'
+        lines.append(line.encode("utf-8"))
+    opml = (b"""<?xml version="1.0" encoding="UTF-8"?>
 <opml version="2.0">
   <head><title>Feeds export</title></head>
   <body>
-{lines}
+""" + b"\n".join(lines) + b"""
   </body>
 </opml>
-""".format(lines="\n".join(lines))
-    with open(out_path, "w", encoding="utf-8") as f:
-        f.write(opml)
+""")
+    write_atomic(out_path, opml)
     return True
 
+def parse_items(url: str, markup: bytes, encoding: str | None = None) -> list:
+    """Parte CPU di un feed, in un processo separato: entrano i bytes, escono
+    solo gli item estratti."""
+    return extract_items_generic(markup, url, encoding)
+
+def load_http_cache(path: str) -> dict:
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+def save_http_cache(path: str, cache: dict) -> None:
+    write_atomic(path, json.dumps(cache, indent=1, sort_keys=True).encode("utf-8"))
+
+async def run(rows, out_dir: str, workers: int, cache: dict) -> int:
+    """Scarica tutte le pagine in concorrenza; il parsing va in un pool di
+    processi (un core ciascuno, niente GIL) così non blocca l'event loop.
+    `cache` (nome .xml -> url/etag/lastmod) viene aggiornata sul posto.
+    Ritorna il numero di feed creati o ancora validi."""
+    loop = asyncio.get_running_loop()
+    connector = aiohttp.TCPConnector(limit=workers, limit_per_host=4)
+    procs = min(len(rows), os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=procs) as pool:
+        async with aiohttp.ClientSession(connector=connector,
+                                         headers={"User-Agent": UA}) as session:
+
+            async def one(name: str, url: str) -> bool:
+                # chiave = file di output: due righe con lo stesso URL non si
+                # pestano i piedi. La GET condizionale vale solo se quel .xml
+                # viene dallo stesso URL e c'è ancora.
+                fname = slugify(name) + ".xml"
+                out_path = os.path.join(out_dir, fname)
+                cached = cache.get(fname)
+                if cached and not (cached.get("url") == url and os.path.exists(out_path)):
+                    cached = None
+                try:
+                    res = await fetch_bytes(session, url, cached)
+                    if res is NOT_MODIFIED:
+                        print(f"[+] {name} ← {url}")
+                        print(f"    \u2714 {out_path} (invariato, HTTP 304)")
+                        return True
+                    markup, encoding, validators = res
+                    items = await loop.run_in_executor(
+                        pool, parse_items, url, markup, encoding)
+                    n = len(items)
+                    write_atomic(out_path, build_rss(name, url, items).encode("utf-8"))
+                    if validators["etag"] or validators["lastmod"]:
+                        cache[fname] = {**validators, "url": url}
+                    else:
+                        cache.pop(fname, None)
+                except Exception as e:
+                    print(f"[+] {name} ← {url}")
+                    print(f"    \u2716 Errore: {e}")
+                    return False
+                print(f"[+] {name} ← {url}")
+                if not n:
+                    print("    \u26a0 Nessun articolo trovato (controlla che sia una pagina elenco).")
+                print(f"    \u2714 {out_path} (items: {n})")
+                return True
+
+            done = await asyncio.gather(*(one(name, url) for name, url in rows))
+    return sum(done)
+
+def _active_sheet_index(xlsx_path: str) -> int:
+    """Foglio attivo (activeTab in xl/workbook.xml), come wb.active di openpyxl."""
+    try:
+        with zipfile.ZipFile(xlsx_path) as z:
+            m = re.search(rb'activeTab="(\d+)"', z.read("xl/workbook.xml"))
+    except (OSError, KeyError, zipfile.BadZipFile):
+        return 0
+    return int(m.group(1)) if m else 0
+
+def _sheet_values(xlsx_path: str) -> list:
+    """Valori del foglio attivo, una lista per riga (calamine se disponibile)."""
+    if CalamineWorkbook is not None:
+        wb = CalamineWorkbook.from_path(xlsx_path)
+        return wb.get_sheet_by_index(_active_sheet_index(xlsx_path)).to_python()
+    # read_only: parser XML in streaming, senza oggetti stile/cella
+    wb = load_workbook(xlsx_path, read_only=True, data_only=True)
+    try:
+        return list(wb.active.iter_rows(values_only=True))
+    finally:
+        wb.close()
+
+def _cell_str(value) -> str:
+    # calamine dà i numeri come float: 123 deve restare "123", non "123.0"
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip() if value else ""
+
 def read_excel_rows(xlsx_path: str):
-    wb = load_workbook(xlsx_path)
-    ws = wb.active
-    headers = [ (c.value.strip().lower() if isinstance(c.value, str) else c.value)
-                for c in next(ws.iter_rows(min_row=1, max_row=1)) ]
+    values = _sheet_values(xlsx_path)
+    headers = [ (c.strip().lower() if isinstance(c, str) else c)
+                for c in (values[0] if values else []) ]
     try:
         name_idx = headers.index("name")
         url_idx  = headers.index("url")
     except ValueError:
         raise SystemExit("L'Excel deve avere intestazioni: 'name' e 'url' sulla prima riga.")
     rows = []
-    for row in ws.iter_rows(min_row=2, values_only=True):
+    for row in values[1:]:
         if not row: 
             continue
-        name = (str(row[name_idx]).strip() if row[name_idx] else "")
-        url  = (str(row[url_idx]).strip()  if row[url_idx]  else "")
+        name = _cell_str(row[name_idx])
+        url  = _cell_str(row[url_idx])
         if name and url:
             rows.append((name, url))
     if not rows:
@@ -238,28 +469,21 @@ def main():
     ap = argparse.ArgumentParser(description="Crea feed RSS da Excel e OPML finale.")
     ap.add_argument("--excel", required=True, help="File Excel (name,url)")
     ap.add_argument("--out", default="./output_feeds", help="Cartella output per i .xml")
+    ap.add_argument("--workers", type=int, default=16,
+                    help="Download in parallelo (default: 16)")
+    ap.add_argument("--force", action="store_true",
+                    help="Ignora ETag/Last-Modified salvati e rigenera tutti i feed")
     args = ap.parse_args()
 
     os.makedirs(args.out, exist_ok=True)
     rows = read_excel_rows(args.excel)
 
-    ok = 0
-    for name, url in rows:
-        print(f"[+] {name} ← {url}")
-        try:
-            soup = fetch_html(url)
-            items = extract_items_generic(soup, url)
-            if not items:
-                print("    \u26a0 Nessun articolo trovato (controlla che sia una pagina elenco).")
-            xml = build_rss(name, url, items)
-            fname = slugify(name) + ".xml"
-            out_path = os.path.join(args.out, fname)
-            with open(out_path, "w", encoding="utf-8") as f:
-                f.write(xml)
-            print(f"    \u2714 {out_path} (items: {len(items)})")
-            ok += 1
-        except Exception as e:
-            print(f"    \u2716 Errore: {e}")
+    cache_path = os.path.join(args.out, HTTP_CACHE)
+    cache = {} if args.force else load_http_cache(cache_path)
+    ok = asyncio.run(run(rows, args.out, max(1, args.workers), cache))
+    # solo i feed dell'Excel attuale (via anche le voci di righe rimosse)
+    fnames = {slugify(name) + ".xml" for name, _ in rows}
+    save_http_cache(cache_path, {k: v for k, v in cache.items() if k in fnames})
 
     # OPML
     opml_path = os.path.join(args.out, "feeds.opml")